@@ -0,0 +1,236 @@
+import asyncio
+import atexit
+import csv
+import re
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+
+POLL_FREQUENCY = 0.1
+COMMAND_POOL_SIZE = 10
+CSV_BUFFER = 1 << 20
+USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+)
+# (email, full_name, username) as read from an input or output CSV
+InputRow = Tuple[str, str, str]
+# Cheap syntactic gate; malformed addresses never reach the browser
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+HIDE_WEBDRIVER_JS = """
+Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+const newProto = navigator.__proto__;
+delete newProto.webdriver;
+navigator.__proto__ = newProto;
+"""
+
+DriverKey = Tuple[bool, Tuple[int, int], Optional[str], bool, bool, Optional[str]]
+# One live driver per configuration. A plain dict rather than lru_cache so a dead or restarted
+# driver can be evicted and the next get_driver() builds a fresh one.
+_drivers: Dict[DriverKey, webdriver.Chrome] = {}
+
+
+@lru_cache(maxsize=None)
+def chromedriver_path() -> str:
+    # install() does a version check over the network; resolve once and hand the path to make_driver,
+    # including to pool workers, which under spawn would not inherit this cache
+    return ChromeDriverManager().install()
+
+
+def widen_command_pool(driver: webdriver.Chrome, maxsize: int = COMMAND_POOL_SIZE):
+    # Selenium's keep-alive PoolManager defaults to one connection per host, so concurrent
+    # commands queue behind each other; new pools pick up connection_pool_kw
+    conn = getattr(driver.command_executor, "_conn", None)
+    if conn is None:
+        return
+    conn.connection_pool_kw["maxsize"] = maxsize
+    conn.clear()
+
+
+def warm_connection(driver: webdriver.Chrome, url: str):
+    # Fire-and-forget request so DNS, TCP and TLS to the login host are underway before the first navigation
+    try:
+        driver.execute_script("fetch(arguments[0], {mode: 'no-cors'}).catch(function () {});", url)
+    except WebDriverException:
+        pass
+
+
+def make_driver(
+    driver_path: str,
+    headless: bool = True,
+    window_size: Tuple[int, int] = (1366, 900),
+    attach: Optional[str] = None,
+    stealth: bool = False,
+    network_log: bool = False,
+    warmup_url: Optional[str] = None,
+) -> webdriver.Chrome:
+    chrome_options = Options()
+    if attach:
+        # Open a tab in a Chrome that is already running; its launch flags and prefs were fixed
+        # when it started, and chromedriver rejects most of them alongside debuggerAddress
+        chrome_options.add_experimental_option("debuggerAddress", attach)
+    else:
+        if headless:
+            chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--window-size=%d,%d" % window_size)
+        chrome_options.add_argument("--lang=en-US,en")
+        chrome_options.add_argument("--user-agent=" + USER_AGENT)
+        if stealth:
+            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+            chrome_options.add_experimental_option("useAutomationExtension", False)
+            chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+            chrome_options.add_argument("--disable-features=UserAgentClientHint")
+            chrome_options.add_argument("--remote-allow-origins=*")
+
+        # Images and notifications are irrelevant to the text-based checks; stylesheets stay on
+        # because the visibility checks depend on them
+        chrome_options.add_argument("--disable-extensions")
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2,
+        })
+
+    # driver.get() returns at DOMContentLoaded; every step after it waits on explicit conditions
+    chrome_options.page_load_strategy = "eager"
+
+    if network_log:
+        # Network events land in the performance log, where callers read them back
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    widen_command_pool(driver)
+    if attach:
+        driver.switch_to.new_window("tab")
+
+    if stealth:
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": HIDE_WEBDRIVER_JS})
+        except Exception:
+            pass
+    if network_log:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+        except WebDriverException:
+            pass
+
+    if warmup_url:
+        warm_connection(driver, warmup_url)
+    return driver
+
+
+def get_driver(
+    driver_path: str,
+    headless: bool = True,
+    window_size: Tuple[int, int] = (1366, 900),
+    attach: Optional[str] = None,
+    stealth: bool = False,
+    network_log: bool = False,
+    warmup_url: Optional[str] = None,
+) -> webdriver.Chrome:
+    key = (headless, window_size, attach, stealth, network_log, warmup_url)
+    driver = _drivers.get(key)
+    if driver is None:
+        driver = _drivers[key] = make_driver(driver_path, *key)
+    return driver
+
+
+def quit_driver(driver: webdriver.Chrome):
+    # Close our tab first: quitting a session attached with --attach leaves the browser running
+    for step in (driver.close, driver.quit):
+        try:
+            step()
+        except Exception:
+            pass
+
+
+def release_driver(driver: webdriver.Chrome):
+    for key, cached in list(_drivers.items()):
+        if cached is driver:
+            del _drivers[key]
+    quit_driver(driver)
+
+
+@atexit.register
+def _quit_all_drivers():
+    while _drivers:
+        _, driver = _drivers.popitem()
+        quit_driver(driver)
+
+
+def wait_until(driver: webdriver.Chrome, condition, timeout: float) -> bool:
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+        return True
+    except TimeoutException:
+        return False
+
+
+def _wait_or_stop(driver: webdriver.Chrome, condition, timeout: float, stop: threading.Event) -> bool:
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: stop.is_set() or condition(d)
+        )
+    except (TimeoutException, WebDriverException):
+        return False
+    return not stop.is_set()
+
+
+async def _race(driver: webdriver.Chrome, conditions, timeout: float) -> Optional[int]:
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    pending = {
+        loop.run_in_executor(None, _wait_or_stop, driver, condition, timeout, stop): i
+        for i, condition in enumerate(conditions)
+    }
+    winner = None
+    try:
+        while pending and winner is None:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                if future.result() and (winner is None or i < winner):
+                    winner = i
+    finally:
+        # Cancelling an executor future does not stop its thread; the losers exit on their next poll
+        stop.set()
+    return winner
+
+
+def race_conditions(
+    driver: webdriver.Chrome, conditions: Sequence[Callable[[webdriver.Chrome], bool]], timeout: float
+) -> Optional[int]:
+    # Poll every condition in its own thread and return the index of the first to hold (lowest index
+    # on a tie), or None on timeout. A slow check no longer delays the others as it does inside one
+    # OR'ed WebDriverWait predicate; the widened command pool lets the commands overlap.
+    return asyncio.run(_race(driver, conditions, timeout))
+
+
+def read_input_rows(path: str) -> Iterable[InputRow]:
+    # Plain csv.reader rows indexed by header position; only three columns are ever used, so a
+    # dict per row is wasted work on large inputs
+    with open(path, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        if "email" not in header:
+            raise ValueError(f"{path} must contain an 'email' column")
+        width = len(header)
+        idx_email = header.index("email")
+        idx_full = header.index("full_name") if "full_name" in header else width
+        idx_user = header.index("username") if "username" in header else width
+        for row in reader:
+            if len(row) <= width:
+                row += [""] * (width + 1 - len(row))
+            yield row[idx_email], row[idx_full], row[idx_user]
@@ -1,51 +1,79 @@
 #!/usr/bin/env python3
 import argparse
 import csv
+import json
 import random
+import re
 import sys
 import time
-from typing import Dict, Iterable, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
 
+from _driver_utils import (
+    EMAIL_RE,
+    InputRow,
+    chromedriver_path,
+    get_driver,
+    race_conditions,
+    read_input_rows,
+    release_driver,
+    wait_until,
+)
+
+WARMUP_URL = "https://login.microsoftonline.com/favicon.ico"
+OUTPUT_FIELDS = ["full_name", "email"]
+FLUSH_EVERY = 10
+# The Colgate tenant only answers for its own domain
+COLGATE_SUFFIX = "@colgate.edu"
+CREDENTIAL_TYPE_PATH = "GetCredentialType"
+# IfExistsResult from GetCredentialType: 0 = account exists in the tenant, 6 = exists in the tenant and as a
+# personal account, 1 = no such account. Other codes (other IdPs) are left to the DOM checks, as is any
+# response with a nonzero ThrottleStatus, whose IfExistsResult can read 0 regardless of the account.
+EXISTS_RESULTS = {0, 6}
+MISSING_RESULTS = {1}
+DECIDED_RESULTS = EXISTS_RESULTS | MISSING_RESULTS
+# Step checks run in the page as one script each instead of a find_elements + is_displayed round trip
+# per selector and element
+IS_VISIBLE_JS = (
+    "function isVisible(el) {"
+    "  return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)"
+    "    && window.getComputedStyle(el).visibility !== 'hidden';"
+    "}"
+)
+USERNAME_STEP_JS = IS_VISIBLE_JS + (
+    "return Array.prototype.some.call("
+    "  document.querySelectorAll(\"#i0116, input[name='loginfmt'], input[type='email']\"), isVisible);"
+)
+PASSWORD_STEP_JS = IS_VISIBLE_JS + (
+    "var pw = document.getElementById('i0118');"
+    "return !!pw && isVisible(pw);"
+)
+USERNAME_SELECTORS = [
+    (By.ID, "i0116"),
+    (By.NAME, "loginfmt"),
+    (By.CSS_SELECTOR, "input[type='email']"),
+]
+# The selector that matched last time; the login page layout is stable between emails
+_username_selector: Optional[Tuple[str, str]] = None
+INVALID_HINTS = (
+    "this username may be incorrect",
+    "we couldn't find an account",
+    "enter a valid email address",
+    "that microsoft account doesn't exist",
+    "couldn't find your account",
+    "no account found",
+)
+# One alternation scans the error text once for every hint
+INVALID_HINTS_RE = re.compile("|".join(map(re.escape, INVALID_HINTS)))
 MS_LOGIN_URL = "https://login.microsoftonline.com/5b75a9d0-188c-4a00-af54-5800ada1149f/saml2?SAMLRequest=lZJRb5swFIXf8ysQ72DjwGasJFLadFukLImabA97qYy5pJaMzXzNtv77Au3W9WGVxuPhnk%2FnHHmBsjWdWPfh3t7C9x4wzKLoV2ssiunXMu69FU6iRmFlCyiCEqf1551gKRWdd8EpZ%2BJXprc9EhF80M6Opu1mGR%2F2N7vDx%2B3%2BjkNRAS%2FmCvI8q%2FKyVHUpGS9YrWTFQDUwZ%2B8Yp6PxK3gcGMt4QE4gxB62FoO0YRApKxLKk4yeGRNzLubs23i1GfppK8PkvA%2BhQ0GIcRdt01Yr79A1wVmjLaTKtaSo3heyrGmSca6SXFKayKbIk4JTKmuZZXnZkLExG%2BHH5zGutK21vby9QvV0hOLT%2BXxMjofTeUSsf29z7Sz2LfgT%2BB9awZfb3UvezvkgzRDQXGSAFOqeyE4T5TxMYe4QHYlXAy6KFqMgpnH86r8AC%2FK39QXWif1QZrs5OqPVw6SP3wfnWxn%2B3TlLs0nRddJMp6K32IHSjYY6%2FoNZG%2BN%2BXnsYci3j4HuII7KazZ7CvH6nq0c%3D&RelayState=https%3A%2F%2Fportal.colgate.edu%2Fapi%2Fcore%2Fsaml_sso"
 
 
-def make_driver(headless: bool = True) -> webdriver.Chrome:
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1366,900")
-    chrome_options.add_argument("--lang=en-US,en")
-    chrome_options.add_argument(
-        "--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-    )
-
-    try:
-        driver = webdriver.Chrome(ChromeDriverManager().install(), options=chrome_options)
-    except TypeError:
-        from selenium.webdriver.chrome.service import Service
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    return driver
-
-
-def read_input_rows(path: str) -> Iterable[Dict[str, str]]:
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield row
-
-
 def load_login_page(driver: webdriver.Chrome, timeout: float = 20.0) -> bool:
     try:
         driver.get(MS_LOGIN_URL)
@@ -57,28 +85,16 @@ def load_login_page(driver: webdriver.Chrome, timeout: float = 20.0) -> bool:
 
 def at_username_step(driver: webdriver.Chrome) -> bool:
     try:
-        return (
-            any(el.is_displayed() for el in driver.find_elements(By.ID, "i0116"))
-            or any(el.is_displayed() for el in driver.find_elements(By.NAME, "loginfmt"))
-            or any(el.is_displayed() for el in driver.find_elements(By.CSS_SELECTOR, "input[type='email']"))
-        )
-    except Exception:
+        return bool(driver.execute_script(USERNAME_STEP_JS))
+    except WebDriverException:
         return False
 
 
 def at_password_step(driver: webdriver.Chrome) -> bool:
     try:
-        pw = [el for el in driver.find_elements(By.ID, "i0118") if el.is_displayed()]
-        if pw:
-            # Also confirm header suggests password entry
-            headers = driver.find_elements(By.ID, "loginHeader")
-            if any("password" in (h.text or "").lower() for h in headers):
-                return True
-            # Or presence of aria-label containing password
-            return True
-    except Exception:
-        pass
-    return False
+        return bool(driver.execute_script(PASSWORD_STEP_JS))
+    except WebDriverException:
+        return False
 
 
 def go_back_to_username(driver: webdriver.Chrome):
@@ -91,13 +107,45 @@ def go_back_to_username(driver: webdriver.Chrome):
             btns = driver.find_elements(by, sel)
             if btns:
                 btns[0].click()
-                time.sleep(0.6)
+                wait_until(driver, at_username_step, 5.0)
                 return
         except Exception:
             continue
     load_login_page(driver)
 
 
+def drain_performance_log(driver: webdriver.Chrome) -> List[Dict]:
+    try:
+        return driver.get_log("performance")
+    except WebDriverException:
+        return []
+
+
+def poll_credential_type(driver: webdriver.Chrome, pending: Set[str]) -> Optional[int]:
+    # The username check is answered by a GetCredentialType XHR; read its IfExistsResult as soon as
+    # the body has arrived instead of waiting for the page to render a verdict
+    for entry in drain_performance_log(driver):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.responseReceived":
+            if CREDENTIAL_TYPE_PATH in params.get("response", {}).get("url", ""):
+                pending.add(params.get("requestId"))
+        elif method == "Network.loadingFinished" and params.get("requestId") in pending:
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                data = json.loads(body.get("body") or "{}")
+                if int(data.get("ThrottleStatus") or 0):
+                    continue
+                return int(data["IfExistsResult"])
+            except (WebDriverException, KeyError, TypeError, ValueError):
+                continue
+    return None
+
+
 def type_like_human(element, text: str):
     for ch in text:
         element.send_keys(ch)
@@ -121,52 +169,81 @@ def find_username_error_text(driver: webdriver.Chrome) -> str:
     return ""
 
 
-def enter_email_and_submit(driver: webdriver.Chrome, email: str, timeout: float = 12.0) -> Optional[bool]:
-    if not at_username_step(driver):
-        go_back_to_username(driver)
+def find_username_input(driver: webdriver.Chrome, timeout: float) -> Optional[object]:
+    global _username_selector
+    if _username_selector is not None:
         try:
-            WebDriverWait(driver, 8.0).until(lambda d: at_username_step(d))
+            return WebDriverWait(driver, 2).until(EC.element_to_be_clickable(_username_selector))
         except TimeoutException:
-            return None
+            pass
+    wait = WebDriverWait(driver, timeout)
+    for locator in USERNAME_SELECTORS:
+        try:
+            email_input = wait.until(EC.element_to_be_clickable(locator))
+        except TimeoutException:
+            continue
+        if email_input.is_displayed():
+            _username_selector = locator
+            return email_input
+    return None
+
 
+def fill_username(driver: webdriver.Chrome, email: str, timeout: float, slow_type: bool = False) -> Optional[object]:
     try:
-        wait = WebDriverWait(driver, timeout)
-        email_input = None
-        for by, sel in [
-            (By.ID, "i0116"),
-            (By.NAME, "loginfmt"),
-            (By.CSS_SELECTOR, "input[type='email']"),
-        ]:
-            try:
-                email_input = wait.until(EC.element_to_be_clickable((by, sel)))
-                if email_input and email_input.is_displayed():
-                    break
-            except TimeoutException:
-                continue
+        email_input = find_username_input(driver, timeout)
         if not email_input:
             return None
         email_input.clear()
-        type_like_human(email_input, email)
-        email_input.send_keys(Keys.RETURN)
+        if slow_type:
+            type_like_human(email_input, email)
+        else:
+            # One WebDriver round trip for the whole address, plus a single short pause
+            email_input.send_keys(email)
+            time.sleep(random.uniform(0.1, 0.25))
+        return email_input
     except TimeoutException:
         return None
 
-    # Wait for an explicit state: visible password OR visible error
-    try:
-        WebDriverWait(driver, 10.0).until(lambda d: at_password_step(d) or (find_username_error_text(d) != ""))
-    except TimeoutException:
-        pass
+
+def enter_email_and_submit(driver: webdriver.Chrome, email: str, timeout: float = 12.0, slow_type: bool = False) -> Optional[bool]:
+    if not at_username_step(driver):
+        go_back_to_username(driver)
+        if not wait_until(driver, at_username_step, 8.0):
+            return None
+
+    email_input = fill_username(driver, email, timeout, slow_type)
+    if email_input is not None and find_username_error_text(driver):
+        # The previous email's error survived retyping; reload so it cannot be misread as this verdict
+        if not load_login_page(driver):
+            return None
+        email_input = fill_username(driver, email, timeout, slow_type)
+    if email_input is None:
+        return None
+    # Discard network events from earlier emails before submitting this one
+    drain_performance_log(driver)
+    email_input.send_keys(Keys.RETURN)
+
+    pending: Set[str] = set()
+    network: Dict[str, int] = {}
+
+    def credential_type_seen(d: webdriver.Chrome) -> bool:
+        if_exists = poll_credential_type(d, pending)
+        if if_exists is not None:
+            network["if_exists"] = if_exists
+        # Only a decisive code ends the race; throttled or federated responses keep waiting for the DOM
+        return network.get("if_exists") in DECIDED_RESULTS
+
+    # Wait for an explicit state: credential-type response, visible password OR visible error
+    race_conditions(driver, (credential_type_seen, at_password_step, find_username_error_text), 10.0)
+
+    if_exists = network.get("if_exists")
+    if if_exists in EXISTS_RESULTS:
+        return True
+    if if_exists in MISSING_RESULTS:
+        return False
 
     err_text = find_username_error_text(driver).lower()
-    invalid_hints = [
-        "this username may be incorrect",
-        "we couldn't find an account",
-        "enter a valid email address",
-        "that microsoft account doesn't exist",
-        "couldn't find your account",
-        "no account found",
-    ]
-    if any(h in err_text for h in invalid_hints):
+    if INVALID_HINTS_RE.search(err_text):
         return False
 
     if at_password_step(driver):
@@ -176,6 +253,11 @@ def enter_email_and_submit(driver: webdriver.Chrome, email: str, timeout: float
     return None
 
 
+def write_valid(writer, row: InputRow):
+    email, full_name, _ = row
+    writer.writerow((full_name, email))
+
+
 def main():
     parser = argparse.ArgumentParser(description="Validate emails via Microsoft login first-step (username check)")
     parser.add_argument("input_csv", help="CSV with an 'email' column")
@@ -185,70 +267,84 @@ def main():
     parser.add_argument("--sleep-max", type=float, default=7.5, help="Maximum sleep between checks")
     parser.add_argument("--cooldown-n", type=int, default=15, help="After N checks, pause longer to avoid flags")
     parser.add_argument("--cooldown-s", type=float, default=30.0, help="Cooldown seconds after cooldown-n")
+    parser.add_argument(
+        "--attach", nargs="?", const="127.0.0.1:9222", default=None, metavar="HOST:PORT",
+        help="Open tabs in an already-running Chrome instead of launching one "
+             "(start it once with: chromium --remote-debugging-port=9222 --user-data-dir=/tmp/p)",
+    )
+    parser.add_argument("--slow-type", action="store_true", help="Type emails one character at a time")
     args = parser.parse_args()
 
     headless = not args.no_headless
-    driver = make_driver(headless=headless)
+    driver = get_driver(
+        chromedriver_path(),
+        headless=headless, window_size=(1366, 900), attach=args.attach, network_log=True, warmup_url=WARMUP_URL
+    )
 
     if not load_login_page(driver):
         print("Failed to load Microsoft login page")
-        driver.quit()
+        release_driver(driver)
         sys.exit(1)
 
-    seen_emails: Set[str] = set()
     valid_emails: Set[str] = set()
 
     try:
-        with open(args.output, newline="", encoding="utf-8") as f:
-            for row in csv.DictReader(f):
-                e = (row.get("email", "") or "").strip().lower()
-                if e:
-                    valid_emails.add(e)
+        for email, _, _ in read_input_rows(args.output):
+            e = email.strip().lower()
+            if e:
+                valid_emails.add(e)
     except FileNotFoundError:
         pass
 
-    def write_valid(row: Dict[str, str]):
-        with open(args.output, "a", newline="", encoding="utf-8") as out:
-            writer = csv.DictWriter(out, fieldnames=["full_name", "email"])
-            if out.tell() == 0:
-                writer.writeheader()
-            writer.writerow({
-                "full_name": row.get("full_name", ""),
-                "email": row.get("email", ""),
-            })
+    # Dedupe against earlier runs and within the input before any browser work; first occurrence wins
+    work: Dict[str, Tuple[int, InputRow]] = {}
+    for idx, row in enumerate(read_input_rows(args.input_csv), start=1):
+        key = row[0].strip().lower()
+        if not key or key in valid_emails or key in work:
+            continue
+        if not key.endswith(COLGATE_SUFFIX) or not EMAIL_RE.match(key):
+            continue
+        work[key] = (idx, row)
+    print(f"{len(work)} unique emails to check")
 
     try:
-        processed = 0
-        for idx, row in enumerate(read_input_rows(args.input_csv), start=1):
-            email = (row.get("email", "") or "").strip()
-            if not email:
-                continue
-            if email.lower() in seen_emails or email.lower() in valid_emails:
-                continue
-            seen_emails.add(email.lower())
-
-            print(f"Checking {idx}: {email}")
-            verdict = enter_email_and_submit(driver, email)
-
-            if verdict is True:
-                write_valid(row)
-                valid_emails.add(email.lower())
-
-            processed += 1
-
-            # Human-like pacing and cooldowns
-            time.sleep(random.uniform(args.sleep_min, args.sleep_max))
-            if args.cooldown_n and processed % args.cooldown_n == 0:
-                time.sleep(args.cooldown_s)
-
-            # Reset to username step for next iteration
-            go_back_to_username(driver)
+        with open(args.output, "a", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            if out.tell() == 0:
+                writer.writerow(OUTPUT_FIELDS)
+
+            processed = 0
+            written = 0
+            for key, (idx, row) in work.items():
+                email = row[0].strip()
+                print(f"Checking {idx}: {email}")
+                # Pacing is measured from the start of the check, so browser time (including the reset
+                # below) counts toward it
+                next_allowed = time.monotonic() + random.uniform(args.sleep_min, args.sleep_max)
+                verdict = enter_email_and_submit(driver, email, slow_type=args.slow_type)
+
+                if verdict is True:
+                    write_valid(writer, row)
+                    valid_emails.add(key)
+                    written += 1
+                    if written % FLUSH_EVERY == 0:
+                        out.flush()
+
+                processed += 1
+
+                # Reset to username step for next iteration; the loaded page is reused as-is when already there
+                if not at_username_step(driver):
+                    go_back_to_username(driver)
+
+                # Human-like pacing and cooldowns
+                remaining = next_allowed - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+                if args.cooldown_n and processed % args.cooldown_n == 0:
+                    time.sleep(args.cooldown_s)
 
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        release_driver(driver)
 
     print(f"Done. Valid emails: {len(valid_emails)}. Output: {args.output}")
 
@@ -1,76 +1,93 @@
 #!/usr/bin/env python3
 import argparse
 import csv
+import json
+import os
 import random
 import sys
 import time
-from typing import Dict, Iterable, Optional, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from multiprocessing.util import Finalize
+from typing import Dict, List, Optional, Set, Tuple
 
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException, ElementNotInteractableException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, WebDriverException, ElementNotInteractableException
 from unidecode import unidecode
 
+from _driver_utils import (
+    EMAIL_RE,
+    InputRow,
+    chromedriver_path,
+    get_driver,
+    race_conditions,
+    read_input_rows,
+    release_driver,
+    wait_until,
+)
+
 
 GOOGLE_SIGNIN_URL = (
     "https://accounts.google.com/signin/v2/identifier"
     "?hl=en&flowName=GlifWebSignIn&flowEntry=ServiceLogin"
 )
+IDENTIFIER_PATH = "/signin/v2/identifier"
+WARMUP_URL = "https://accounts.google.com/generate_204"
+OUTPUT_FIELDS = ["full_name", "username", "email"]
+FLUSH_EVERY = 10
+IDENTIFIER_SELECTORS = [
+    (By.ID, "identifierId"),
+    (By.CSS_SELECTOR, "input[type='email']"),
+    (By.NAME, "identifier"),
+]
+# The selector that matched last time; the sign-in page layout is stable between emails
+_identifier_selector: Optional[Tuple[str, str]] = None
+# Targeted text lookups; driver.page_source would serialize the whole DOM on every check
+INVALID_MESSAGE_XPATH = (
+    "//*[contains(text(), \"Couldn't find your Google Account\")"
+    " or contains(text(), 'Enter a valid email')"
+    " or contains(text(), 'Enter an email or phone number')]"
+)
+WRONG_PASSWORD_XPATH = "//*[contains(text(), 'Wrong password')]"
+PASSWORD_RETRY_XPATH = (
+    "//*[contains(text(), 'Wrong password')"
+    " or contains(text(), 'Enter your password')"
+    " or contains(text(), 'Try again')]"
+)
 
 
-def make_driver(headless: bool = True) -> webdriver.Chrome:
-    chrome_options = Options()
-    if headless:
-        chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1280,900")
-    chrome_options.add_argument("--lang=en-US,en")
-    chrome_options.add_argument(
-        "--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-    )
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"]) 
-    chrome_options.add_experimental_option("useAutomationExtension", False)
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("--disable-features=UserAgentClientHint")
-    chrome_options.add_argument("--remote-allow-origins=*")
-
-    try:
-        driver = webdriver.Chrome(ChromeDriverManager().install(), options=chrome_options)
-    except TypeError:
-        from selenium.webdriver.chrome.service import Service
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-
+def save_cookies(driver: webdriver.Chrome, path: str):
     try:
-        driver.execute_cdp_cmd(
-            "Page.addScriptToEvaluateOnNewDocument",
-            {
-                "source": """
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                const newProto = navigator.__proto__;
-                delete newProto.webdriver;
-                navigator.__proto__ = newProto;
-                """,
-            },
-        )
-    except Exception:
+        cookies = driver.get_cookies()
+        # Pool workers save concurrently; a per-process temp file keeps each os.replace atomic
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cookies, f)
+        os.replace(tmp_path, path)
+    except (OSError, WebDriverException):
         pass
 
-    return driver
-
 
-def read_input_rows(path: str) -> Iterable[Dict[str, str]]:
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield row
+def load_cookies(driver: webdriver.Chrome, path: str) -> bool:
+    try:
+        with open(path, encoding="utf-8") as f:
+            cookies = json.load(f)
+    except (OSError, ValueError):
+        return False
+    try:
+        driver.get(GOOGLE_SIGNIN_URL)
+    except WebDriverException:
+        return False
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+        except WebDriverException:
+            continue
+    return True
 
 
 def consent_click_if_present(driver: webdriver.Chrome):
@@ -85,7 +102,7 @@ def consent_click_if_present(driver: webdriver.Chrome):
             label = (elem.text or "").strip().lower()
             if any(x in label for x in ["i agree", "accept", "agree"]):
                 elem.click()
-                time.sleep(0.3)
+                wait_until(driver, EC.staleness_of(elem), 2.0)
                 return
         except TimeoutException:
             continue
@@ -98,31 +115,20 @@ def account_chooser_bypass(driver: webdriver.Chrome):
         chooser = driver.find_elements(By.XPATH, "//div[text()='Use another account' or contains(., 'Use another account')]")
         if chooser:
             chooser[0].click()
-            time.sleep(0.4)
+            wait_until(driver, lambda d: any(d.find_elements(by, sel) for by, sel in IDENTIFIER_SELECTORS), 5.0)
     except Exception:
         pass
 
 
 def detect_invalid_by_message(driver: webdriver.Chrome) -> bool:
-    page = driver.page_source or ""
-    if "Couldn't find your Google Account" in page:
-        return True
-    if "Enter a valid email" in page or "Enter an email or phone number" in page:
-        return True
     try:
-        err = driver.find_elements(By.CSS_SELECTOR, "div.o6cuMc")
-        for e in err:
-            if "Couldn't find" in (e.text or ""):
+        for e in driver.find_elements(By.CSS_SELECTOR, "div.o6cuMc, div[aria-live='assertive']"):
+            text = e.text or ""
+            if "Couldn't find" in text or "Enter a valid" in text:
                 return True
-    except Exception:
-        pass
-    try:
-        error_div = driver.find_element(By.CSS_SELECTOR, "div[aria-live='assertive']")
-        if error_div and error_div.text and ("Couldn't find" in error_div.text or "Enter a valid" in error_div.text):
-            return True
-    except NoSuchElementException:
-        pass
-    return False
+        return bool(driver.find_elements(By.XPATH, INVALID_MESSAGE_XPATH))
+    except WebDriverException:
+        return False
 
 
 def is_saml_flow(driver: webdriver.Chrome) -> bool:
@@ -149,6 +155,10 @@ def at_password_step(driver: webdriver.Chrome) -> bool:
     return False
 
 
+def identifier_step_settled(driver: webdriver.Chrome) -> bool:
+    return at_password_step(driver) or detect_invalid_by_message(driver) or is_saml_flow(driver)
+
+
 def submit_wrong_password_and_check(driver: webdriver.Chrome, timeout: float = 10.0) -> Optional[bool]:
     try:
         wait = WebDriverWait(driver, timeout)
@@ -165,30 +175,38 @@ def submit_wrong_password_and_check(driver: webdriver.Chrome, timeout: float = 1
         return None
 
     try:
-        WebDriverWait(driver, 8.0).until(lambda d: ("Wrong password" in (d.page_source or "")) or detect_invalid_by_message(d))
+        WebDriverWait(driver, 8.0).until(lambda d: d.find_elements(By.XPATH, WRONG_PASSWORD_XPATH) or detect_invalid_by_message(d))
     except TimeoutException:
         pass
 
-    page = driver.page_source or ""
-    if "Wrong password" in page or "Enter your password" in page or "Try again" in page:
+    if driver.find_elements(By.XPATH, PASSWORD_RETRY_XPATH):
         return True
     if detect_invalid_by_message(driver):
         return False
     return None
 
 
-def find_identifier_input(wait: WebDriverWait) -> Optional[object]:
-    selectors = [
-        (By.ID, "identifierId"),
-        (By.CSS_SELECTOR, "input[type='email']"),
-        (By.NAME, "identifier"),
-    ]
-    for by, sel in selectors:
+def identifier_selectors() -> List[Tuple[str, str]]:
+    if _identifier_selector is None:
+        return IDENTIFIER_SELECTORS
+    return [_identifier_selector] + [loc for loc in IDENTIFIER_SELECTORS if loc != _identifier_selector]
+
+
+def find_identifier_input(driver: webdriver.Chrome, timeout: float) -> Optional[object]:
+    global _identifier_selector
+    if _identifier_selector is not None:
+        try:
+            return WebDriverWait(driver, 2).until(EC.element_to_be_clickable(_identifier_selector))
+        except TimeoutException:
+            pass
+    wait = WebDriverWait(driver, timeout)
+    for locator in IDENTIFIER_SELECTORS:
         try:
-            elem = wait.until(EC.element_to_be_clickable((by, sel)))
-            return elem
+            elem = wait.until(EC.element_to_be_clickable(locator))
         except TimeoutException:
             continue
+        _identifier_selector = locator
+        return elem
     return None
 
 
@@ -203,7 +221,32 @@ def click_next_if_present(driver: webdriver.Chrome):
         pass
 
 
-def validate_email_google(driver: webdriver.Chrome, email: str, per_item_timeout: float = 15.0) -> Optional[bool]:
+def reuse_identifier_step(driver: webdriver.Chrome, email: str) -> Optional[object]:
+    # Fast reset: retype into the sign-in tab that is already loaded instead of a full driver.get()
+    if "accounts.google.com" not in (driver.current_url or ""):
+        return None
+    try:
+        driver.execute_script("window.history.pushState({}, '', arguments[0]);", IDENTIFIER_PATH)
+        email_input = None
+        for by, sel in identifier_selectors():
+            visible = [el for el in driver.find_elements(by, sel) if el.is_displayed()]
+            if visible:
+                email_input = visible[0]
+                break
+        # Only a visible, empty input with no leftover error is reusable; anything else means a reload,
+        # and checking before typing keeps that fallback from costing a wasted send_keys first
+        if email_input is None or email_input.get_attribute("value"):
+            return None
+        # An error left over from the previous email would be misread as this email's verdict
+        if detect_invalid_by_message(driver):
+            return None
+        email_input.send_keys(email)
+        return email_input
+    except WebDriverException:
+        return None
+
+
+def load_identifier_step(driver: webdriver.Chrome, email: str, timeout: float) -> Optional[object]:
     try:
         driver.get(GOOGLE_SIGNIN_URL)
     except WebDriverException:
@@ -212,67 +255,156 @@ def validate_email_google(driver: webdriver.Chrome, email: str, per_item_timeout
     consent_click_if_present(driver)
     account_chooser_bypass(driver)
 
+    email_input = find_identifier_input(driver, timeout)
+    if not email_input:
+        return None
+    driver.execute_script("arguments[0].scrollIntoView({block:'center'});", email_input)
     try:
-        wait = WebDriverWait(driver, per_item_timeout)
-        email_input = find_identifier_input(wait)
+        email_input.click()
+    except Exception:
+        pass
+    try:
+        email_input.clear()
+    except ElementNotInteractableException:
+        # try re-fetching as clickable
+        email_input = find_identifier_input(driver, timeout)
+    try:
+        email_input.send_keys(email)
+    except ElementNotInteractableException:
+        email_input = find_identifier_input(driver, timeout)
         if not email_input:
             return None
-        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", email_input)
-        try:
-            email_input.click()
-        except Exception:
-            pass
-        try:
-            email_input.clear()
-        except ElementNotInteractableException:
-            # try re-fetching as clickable
-            email_input = find_identifier_input(wait)
-        try:
-            email_input.send_keys(email)
-        except ElementNotInteractableException:
-            email_input = find_identifier_input(wait)
-            if not email_input:
-                return None
-            email_input.send_keys(email)
-        # Submit via Enter and also click Next as fallback
-        email_input.send_keys(Keys.RETURN)
-        time.sleep(0.3)
-        click_next_if_present(driver)
-    except TimeoutException:
-        return None
-
-    time.sleep(1.2)
+        email_input.send_keys(email)
+    return email_input
 
-    if is_saml_flow(driver):
-        return None
-
-    if detect_invalid_by_message(driver):
-        return False
-
-    if at_password_step(driver):
-        return submit_wrong_password_and_check(driver)
 
+def validate_email_google(driver: webdriver.Chrome, email: str, per_item_timeout: float = 15.0) -> Optional[bool]:
     try:
-        WebDriverWait(driver, 8.0).until(lambda d: at_password_step(d) or detect_invalid_by_message(d) or is_saml_flow(d))
+        email_input = reuse_identifier_step(driver, email)
+        if email_input is None:
+            email_input = load_identifier_step(driver, email, per_item_timeout)
+        if email_input is None:
+            return None
+        # Submit via Enter and click Next only if the page hasn't moved on by itself
+        email_input.send_keys(Keys.RETURN)
+        if not wait_until(driver, identifier_step_settled, 1.0):
+            click_next_if_present(driver)
     except TimeoutException:
-        pass
-
-    if is_saml_flow(driver):
         return None
-    if detect_invalid_by_message(driver):
+
+    settled = race_conditions(driver, (is_saml_flow, detect_invalid_by_message, at_password_step), 8.0)
+
+    if settled == 1:
         return False
-    if at_password_step(driver):
+    if settled == 2:
         return submit_wrong_password_and_check(driver)
 
+    # SAML hand-off or no verdict in time
     return None
 
 
+@lru_cache(maxsize=4096)
 def normalize_person_key(full_name: str, username: str) -> Tuple[str, str]:
-    name_key = unidecode(full_name or "").strip().lower()
+    # Permuted inputs repeat the same name on every candidate row; ASCII names skip unidecode
+    name = full_name or ""
+    name_key = (name if name.isascii() else unidecode(name)).strip().lower()
     user_key = (username or "").strip().lower()
     return name_key, user_key
 
 
+def write_valid(writer, row: InputRow):
+    email, full_name, username = row
+    writer.writerow((full_name, username, email))
+
+
+MAX_WORKERS = 4
+PEOPLE_PER_WORKER = 25
+
+# Per-process state for the worker pool: each worker owns one Chrome for its lifetime
+_worker_args: Optional[argparse.Namespace] = None
+_worker_driver_path: Optional[str] = None
+_worker_driver: Optional[webdriver.Chrome] = None
+_worker_checked = 0
+_worker_cookies_saved = False
+
+
+def default_worker_count(n_people: int) -> int:
+    # Small inputs are not worth several browser start-ups; large ones stay under Google's per-IP pacing
+    wanted = -(-n_people // PEOPLE_PER_WORKER)
+    return max(1, min(os.cpu_count() or 1, MAX_WORKERS, wanted))
+
+
+def _quit_worker_driver():
+    global _worker_driver
+    if _worker_driver is not None:
+        release_driver(_worker_driver)
+        _worker_driver = None
+
+
+def _init_worker(args: argparse.Namespace, driver_path: str):
+    global _worker_args, _worker_driver_path
+    _worker_args = args
+    _worker_driver_path = driver_path
+    # Fresh per-process seed so workers don't share sleep windows, plus a staggered start
+    random.seed()
+    Finalize(None, _quit_worker_driver, exitpriority=10)
+    time.sleep(random.uniform(0.0, args.sleep_max))
+
+
+def _get_worker_driver() -> webdriver.Chrome:
+    global _worker_driver
+    if _worker_driver is None:
+        _worker_driver = get_driver(
+            _worker_driver_path,
+            headless=not _worker_args.no_headless,
+            window_size=(1280, 900),
+            attach=_worker_args.attach,
+            stealth=True,
+            warmup_url=WARMUP_URL,
+        )
+        load_cookies(_worker_driver, _worker_args.cookie_file)
+    return _worker_driver
+
+
+def _check_person(rows: List[InputRow]) -> Tuple[Optional[InputRow], int]:
+    global _worker_checked, _worker_cookies_saved
+    args = _worker_args
+    checked = 0
+    for row in rows:
+        try:
+            driver = _get_worker_driver()
+            # Pacing is measured from the start of the check, so time spent in the browser counts toward it
+            next_allowed = time.monotonic() + random.uniform(args.sleep_min, args.sleep_max)
+            verdict = validate_email_google(driver, row[0].strip())
+        except Exception as e:
+            # A raised task would abort main's result loop; drop the possibly broken browser and report
+            # this person as unresolved instead
+            print(f"Check failed for {row[0].strip()}: {e!r}", file=sys.stderr)
+            _quit_worker_driver()
+            return None, checked
+        checked += 1
+        _worker_checked += 1
+
+        if verdict is not None and not _worker_cookies_saved:
+            save_cookies(driver, args.cookie_file)
+            _worker_cookies_saved = True
+
+        if verdict is None:
+            time.sleep(random.uniform(args.sleep_min + 1.0, args.sleep_max + 3.0))
+
+        remaining = next_allowed - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        if args.restart_n and (_worker_checked % args.restart_n == 0):
+            _quit_worker_driver()
+            time.sleep(2.0)
+
+        if verdict is True:
+            return row, checked
+    return None, checked
+
+
 def main():
     parser = argparse.ArgumentParser(description="Validate emails via Google sign-in flow (existence ping)")
     parser.add_argument("input_csv", nargs="?", default="permuted_emails.csv", help="CSV with at least an 'email' column")
@@ -281,82 +413,78 @@ def main():
     parser.add_argument("--sleep-min", type=float, default=1.8, help="Minimum sleep between checks (seconds)")
     parser.add_argument("--sleep-max", type=float, default=4.0, help="Maximum sleep between checks (seconds)")
     parser.add_argument("--restart-n", type=int, default=200, help="Restart the browser after N checks to reduce rate limits")
+    parser.add_argument("--cookie-file", default="google_cookies.json", help="Where to cache sign-in page cookies between runs")
+    parser.add_argument(
+        "--attach", nargs="?", const="127.0.0.1:9222", default=None, metavar="HOST:PORT",
+        help="Open tabs in an already-running Chrome instead of launching one "
+             "(start it once with: chromium --remote-debugging-port=9222 --user-data-dir=/tmp/p)",
+    )
+    parser.add_argument("--workers", type=int, default=0, help=f"Parallel Chrome instances (0 = size from input, at most {MAX_WORKERS})")
     args = parser.parse_args()
 
-    headless = not args.no_headless
-
-    driver = make_driver(headless=headless)
-
     seen_emails: Set[str] = set()
     valid_emails: Set[str] = set()
     assigned_people: Set[Tuple[str, str]] = set()
 
     try:
-        with open(args.output, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                valid_emails.add((row.get("email", "") or "").strip())
-                assigned_people.add(normalize_person_key(row.get("full_name", ""), row.get("username", "")))
+        for email, full_name, username in read_input_rows(args.output):
+            valid_emails.add(email.strip().lower())
+            assigned_people.add(normalize_person_key(full_name, username))
     except FileNotFoundError:
         pass
 
-    total_checked = 0
+    # Group candidate emails by person: a worker tries one person's permutations in order and
+    # stops at the first valid one, so people are the unit of parallelism
+    people: Dict[Tuple[str, str], List[InputRow]] = {}
+    for row in read_input_rows(args.input_csv):
+        email, full_name, username = row
+        key = email.strip().lower()
+        if not key or key in seen_emails or key in valid_emails:
+            continue
+        if not EMAIL_RE.match(key):
+            continue
+        person_key = normalize_person_key(full_name, username)
+        if person_key in assigned_people:
+            continue
+
+        seen_emails.add(key)
+        people.setdefault(person_key, []).append(row)
+
+    n_emails = len(seen_emails)
     total_valid = len(valid_emails)
+    # The dedupe sets are done with; drop them before forking so workers don't each carry a copy
+    del seen_emails, valid_emails, assigned_people
 
-    def write_valid(row: Dict[str, str]):
-        nonlocal total_valid
-        with open(args.output, "a", newline="", encoding="utf-8") as out:
-            writer = csv.DictWriter(out, fieldnames=["full_name", "username", "email"])
-            if out.tell() == 0:
-                writer.writeheader()
-            writer.writerow({
-                "full_name": row.get("full_name", ""),
-                "username": row.get("username", ""),
-                "email": row.get("email", ""),
-            })
-        total_valid += 1
+    workers = args.workers or default_worker_count(len(people))
+    # Resolve the driver binary once here; workers get the path through initargs, since spawned
+    # workers start with an empty cache and would each repeat the network version check
+    driver_path = chromedriver_path()
+    print(f"Checking {n_emails} emails for {len(people)} people with {workers} worker(s)")
 
-    try:
-        for idx, row in enumerate(read_input_rows(args.input_csv), start=1):
-            email = (row.get("email", "") or "").strip()
-            full_name = row.get("full_name", "") or ""
-            username = row.get("username", "") or ""
-            person_key = normalize_person_key(full_name, username)
-
-            if not email or email in seen_emails or email in valid_emails:
-                continue
-            if person_key in assigned_people:
-                continue
-
-            seen_emails.add(email)
-
-            verdict = validate_email_google(driver, email)
-            total_checked += 1
-
-            if verdict is True:
-                write_valid(row)
-                assigned_people.add(person_key)
-            elif verdict is None:
-                time.sleep(random.uniform(args.sleep_min + 1.0, args.sleep_max + 3.0))
-
-            if total_checked % 25 == 0:
-                print(f"Checked {total_checked} emails, {total_valid} valid found...")
-
-            time.sleep(random.uniform(args.sleep_min, args.sleep_max))
-
-            if args.restart_n and (total_checked % args.restart_n == 0):
-                try:
-                    driver.quit()
-                except Exception:
-                    pass
-                time.sleep(2.0)
-                driver = make_driver(headless=headless)
-
-    finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+    total_checked = 0
+
+    # Results are written only from this process, so rows from different workers never interleave
+    with open(args.output, "a", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        if out.tell() == 0:
+            writer.writerow(OUTPUT_FIELDS)
+
+        written = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(args, driver_path)) as executor:
+            futures = [executor.submit(_check_person, rows) for rows in people.values()]
+            for future in as_completed(futures):
+                valid_row, checked = future.result()
+                if valid_row is not None:
+                    write_valid(writer, valid_row)
+                    total_valid += 1
+                    written += 1
+                    if written % FLUSH_EVERY == 0:
+                        out.flush()
+
+                previous = total_checked
+                total_checked += checked
+                if total_checked // 25 != previous // 25:
+                    print(f"Checked {total_checked} emails, {total_valid} valid found...")
 
     print(f"Done. Checked {total_checked} unique emails. Valid: {total_valid}. Output: {args.output}")
 
@@ -1,35 +1,34 @@
 #!/usr/bin/env python3
 import argparse
 import csv
+import hashlib
 import os
-import re
-from typing import Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv, find_dotenv
 import google.generativeai as genai
-from unidecode import unidecode
+
+from names_common import (
+    CSV_BUFFER,
+    load_responses,
+    load_seen_keys,
+    normalize_display_name,
+    open_seen_db,
+    read_name_column,
+    record_response,
+    record_seen_key,
+    to_ascii,
+)
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 
 def read_names(path: str) -> List[str]:
-    names: List[str] = []
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        name_key = None
-        header = reader.fieldnames or []
-        for k in header:
-            lk = k.lower()
-            if lk in ("fullname", "full_name", "name"):
-                name_key = k
-                break
-        if name_key is None and "fullName" in header:
-            name_key = "fullName"
-        if name_key is None:
-            raise ValueError("Input CSV must contain a full name column (e.g., fullName)")
-        for row in reader:
-            raw = (row.get(name_key, "") or "").strip()
-            if raw:
-                names.append(raw)
-    return names
+    return [raw for raw in read_name_column(path) if raw]
 
 
 def chunk(lst: List[str], size: int) -> Iterable[List[str]]:
@@ -47,21 +46,6 @@ SYSTEM_RULES = (
     "Return: a JSON array (and nothing else) of kept names as plain strings (no objects)."
 )
 
-EMOJI_PATTERN = re.compile(
-    r"[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF\U00002700-\U000027BF\U0001F900-\U0001F9FF\U0001FA70-\U0001FAFF]",
-    flags=re.UNICODE,
-)
-
-
-def normalize_display_name(name: str) -> str:
-    s = unidecode(name or "").strip()
-    s = EMOJI_PATTERN.sub(" ", s)
-    s = re.sub(r"[^A-Za-z\s\-'\.]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    # Title-case words; keep "Mc"/"O'" forms simple
-    s = " ".join(w.capitalize() for w in s.split())
-    return s
-
 
 def extract_string_from_item(item) -> Optional[str]:
     if isinstance(item, str):
@@ -77,32 +61,44 @@ def extract_string_from_item(item) -> Optional[str]:
     return None
 
 
+def strings_from_array(arr) -> Optional[List[str]]:
+    if not isinstance(arr, list):
+        return None
+    out: List[str] = []
+    for it in arr:
+        s = extract_string_from_item(it)
+        if s:
+            out.append(s)
+    return out
+
+
+def strip_code_fence(text: str) -> str:
+    # Keep what is inside a ```json ... ``` fence; the language tag sits on the opening fence line
+    start = text.find("```")
+    if start == -1:
+        return text.strip()
+    end = text.rfind("```")
+    body_start = text.find("\n", start)
+    if end <= start or body_start == -1 or body_start > end:
+        return text.replace("```", " ").strip()
+    return text[body_start + 1 : end].strip()
+
+
 def parse_json_array_to_strings(text: str) -> List[str]:
-    import json
     try:
-        arr = json.loads(text)
-        if isinstance(arr, list):
-            out: List[str] = []
-            for it in arr:
-                s = extract_string_from_item(it)
-                if s:
-                    out.append(s)
+        out = strings_from_array(json_loads(text))
+        if out is not None:
             return out
     except Exception:
         pass
     # Strip code fences and try to locate first JSON array
-    cleaned = re.sub(r"```.*?```", " ", text, flags=re.DOTALL).strip()
+    cleaned = strip_code_fence(text)
     start = cleaned.find("[")
     end = cleaned.rfind("]")
     if start != -1 and end != -1 and end > start:
         try:
-            arr = json.loads(cleaned[start : end + 1])
-            if isinstance(arr, list):
-                out: List[str] = []
-                for it in arr:
-                    s = extract_string_from_item(it)
-                    if s:
-                        out.append(s)
+            out = strings_from_array(json_loads(cleaned[start : end + 1]))
+            if out is not None:
                 return out
         except Exception:
             pass
@@ -111,14 +107,17 @@ def parse_json_array_to_strings(text: str) -> List[str]:
     return [normalize_display_name(ln) for ln in lines]
 
 
-def classify_names_gemini(names: List[str], model_name: str = "gemini-1.5-flash") -> List[str]:
-    inputs = [unidecode(n) for n in names]
+def request_gemini(names: List[str], model_name: str = "gemini-1.5-flash") -> str:
+    inputs = [to_ascii(n) for n in names]
     prompt = (
         SYSTEM_RULES + "\nInput (JSON array):\n" + str(inputs)
     )
     model = genai.GenerativeModel(model_name, generation_config={"response_mime_type": "application/json"})
     resp = model.generate_content(prompt)
-    text = resp.text or "[]"
+    return resp.text or "[]"
+
+
+def kept_names(text: str) -> List[str]:
     kept = parse_json_array_to_strings(text)
     # Deduplicate within batch while preserving order
     seen = set()
@@ -132,14 +131,27 @@ def classify_names_gemini(names: List[str], model_name: str = "gemini-1.5-flash"
     return out
 
 
+def classify_names_gemini(names: List[str], model_name: str = "gemini-1.5-flash") -> List[str]:
+    return kept_names(request_gemini(names, model_name))
+
+
+def batch_key(model_name: str, names: List[str]) -> str:
+    return hashlib.sha1("\0".join([model_name] + names).encode("utf-8")).hexdigest()
+
+
 def main():
     parser = argparse.ArgumentParser(description="Extract likely real names using Google Gemini")
     parser.add_argument("input_csv", nargs="?", default="pepperdineCO2029.csv", help="Input CSV path")
     parser.add_argument("--output", "-o", default="real_names_llm.csv", help="Output CSV path")
     parser.add_argument("--batch", type=int, default=60, help="Batch size for LLM calls")
     parser.add_argument("--model", default="gemini-1.5-flash", help="Gemini model name")
+    parser.add_argument("--concurrency", type=int, default=8, help="Batches in flight at once")
     parser.add_argument("--env", dest="env_path", default=None, help="Path to a .env file containing GEMINI_API_KEY")
     parser.add_argument("--api-key", dest="api_key", default=None, help="Explicit Gemini API key (overrides env)")
+    parser.add_argument(
+        "--seen-db", default=None,
+        help="SQLite file of kept names and cached responses from earlier runs; new names are appended to the output",
+    )
     args = parser.parse_args()
 
     if args.env_path and os.path.exists(args.env_path):
@@ -158,25 +170,68 @@ def main():
 
     all_names = read_names(args.input_csv)
 
-    kept_total: List[str] = []
-    seen = set()
+    conn = open_seen_db(args.seen_db) if args.seen_db else None
+    # Batches answered in an earlier run are replayed from the cache instead of calling the API again
+    cached: Dict[str, str] = load_responses(conn) if conn is not None else {}
 
-    for batch_names in chunk(all_names, args.batch):
-        outputs = classify_names_gemini(batch_names, model_name=args.model)
-        for out in outputs:
-            key = out.lower()
-            if not key or key in seen:
-                continue
-            seen.add(key)
-            kept_total.append(out)
-
-    with open(args.output, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(["full_name"])  # single column
-        for nm in kept_total:
-            writer.writerow([nm])
-
-    print(f"Wrote {len(kept_total)} names to {args.output}")
+    # Keys are stored as UTF-8 bytes: names are ASCII after normalization, and a bytes object is
+    # smaller than the equivalent str
+    seen: Set[bytes] = set()
+    if conn is not None:
+        seen.update(key.encode() for key in load_seen_keys(conn))
+    written = 0
+
+    def fetch(batch_names: List[str]) -> Tuple[str, str, bool]:
+        key = batch_key(args.model, batch_names)
+        text = cached.get(key)
+        if text is not None:
+            return key, text, True
+        return key, request_gemini(batch_names, model_name=args.model), False
+
+    try:
+        with open(args.output, "a" if conn is not None else "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(["full_name"])  # single column
+            # Each batch is a network round trip, so several run at once; results are still consumed in
+            # batch order, which keeps the first-seen dedupe and the output order deterministic
+            with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+                futures = [executor.submit(fetch, batch_names) for batch_names in chunk(all_names, args.batch)]
+                try:
+                    for future in futures:
+                        key, text, from_cache = future.result()
+                        # The connection is only touched from this thread
+                        if conn is not None and not from_cache:
+                            record_response(conn, key, text)
+                        for out in kept_names(text):
+                            out_key = out.lower()
+                            out_bytes = out_key.encode()
+                            if not out_bytes or out_bytes in seen:
+                                continue
+                            seen.add(out_bytes)
+                            writer.writerow([out])
+                            written += 1
+                            if conn is not None:
+                                record_seen_key(conn, out_key)
+                        if conn is not None:
+                            conn.commit()
+                except BaseException:
+                    # Don't pay for batches nobody will read: cancel the queued ones, let in-flight calls
+                    # finish, and cache every answer that did arrive so a rerun replays it
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    if conn is not None:
+                        for future in futures:
+                            if future.done() and not future.cancelled() and future.exception() is None:
+                                key, text, from_cache = future.result()
+                                if not from_cache:
+                                    record_response(conn, key, text)
+                    raise
+    finally:
+        if conn is not None:
+            conn.commit()
+            conn.close()
+
+    print(f"Wrote {written} names to {args.output}")
 
 
 if __name__ == "__main__":
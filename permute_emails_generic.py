@@ -2,24 +2,55 @@
 import argparse
 import csv
 import re
+import string
+from contextlib import ExitStack
+from functools import lru_cache, partial
+from multiprocessing import Pool
 from typing import Iterable, List, Optional, Set, Tuple
 
-from unidecode import unidecode
+from unidecode import unidecode_expect_nonascii
 
+from names_common import CSV_BUFFER, NAME_CHARS, NAME_COLUMN_ALIASES, CharTable, resolve_columns
 
+_PLAIN_NAME = re.compile(r"[A-Za-z\s]*")
+_LOCAL_SEPARATORS = frozenset("._-")
+WRITE_CHUNK = 4096
+COLUMN_ROLES = {
+    "full": NAME_COLUMN_ALIASES,
+    "user": frozenset({"username", "user_name", "handle"}),
+    "first": frozenset({"first_name", "firstname", "first"}),
+    "last": frozenset({"last_name", "lastname", "last"}),
+}
+# Deletes everything but a-z
+_KEEP_AZ = CharTable(string.ascii_lowercase, None)
+# Characters allowed in a generated local part
+_LOCAL_CHARS = CharTable(string.ascii_lowercase + string.digits + "._-", None)
+
+
+def to_ascii(s: str) -> str:
+    # Most names are already ASCII, which unidecode would return unchanged
+    return s if s.isascii() else unidecode_expect_nonascii(s)
+
+
+# Name lists repeat names and name parts; these are pure, so each distinct input is worked out once
+@lru_cache(maxsize=65536)
 def normalize_token(token: str) -> str:
-    token = unidecode(token)
-    token = token.lower()
-    token = re.sub(r"[^a-z]", "", token)
-    return token
+    return to_ascii(token).lower().translate(_KEEP_AZ)
 
 
+@lru_cache(maxsize=65536)
 def split_name(full_name_raw: str) -> Tuple[Optional[str], Optional[str]]:
     if not full_name_raw:
         return None, None
-    ascii_name = unidecode(full_name_raw)
-    ascii_name = re.sub(r"[\-\._]+", " ", ascii_name)
-    ascii_name = re.sub(r"[^A-Za-z\s]", " ", ascii_name)
+    if full_name_raw.isascii() and _PLAIN_NAME.fullmatch(full_name_raw):
+        # Letters and whitespace only: nothing to transliterate or scrub, every part is already a token
+        parts = full_name_raw.lower().split()
+        if len(parts) == 0:
+            return None, None
+        if len(parts) == 1:
+            return parts[0], None
+        return parts[0], parts[-1]
+    ascii_name = to_ascii(full_name_raw).translate(NAME_CHARS)
     parts = [p for p in ascii_name.strip().split() if p]
     if len(parts) == 0:
         return None, None
@@ -31,67 +62,107 @@ def split_name(full_name_raw: str) -> Tuple[Optional[str], Optional[str]]:
     return (first if first else None), (last if last else None)
 
 
-def generate_permutations(first: Optional[str], last: Optional[str], domain: str) -> Set[str]:
-    candidates: Set[str] = set()
+def collapse_separators(local_part: str) -> str:
+    # Keep the first character of each run of '.', '_' and '-'
+    out: List[str] = []
+    prev_sep = False
+    for ch in local_part:
+        is_sep = ch in _LOCAL_SEPARATORS
+        if is_sep and prev_sep:
+            continue
+        out.append(ch)
+        prev_sep = is_sep
+    return "".join(out)
+
+
+def _is_token(s: str) -> bool:
+    # What normalize_token produces: lowercase ASCII letters only
+    return s.isascii() and s.isalpha() and s.islower()
+
+
+def _strict_perms(f: str, l: str, fi: str, li: str, suffix: str) -> Tuple[str, ...]:
+    # first.last, flast, firstl, firstlast for clean tokens: every one is already a valid local part,
+    # so the translate/collapse/strip cleanup would return it unchanged
+    return (f + "." + l + suffix, fi + l + suffix, f + li + suffix, f + l + suffix)
+
+
+# Common names repeat; the result is an immutable tuple so one cached value can be handed to every
+# caller. A name yields at most four addresses, so duplicates are left for main's global dedup.
+@lru_cache(maxsize=100_000)
+def generate_permutations(first: Optional[str], last: Optional[str], domain: str) -> Tuple[str, ...]:
     if not first and not last:
-        return candidates
+        return ()
     f = (first or "")
     l = (last or "")
     fi = f[:1] if f else ""
     li = l[:1] if l else ""
+    at_domain = "@" + domain
+    if f and l and _is_token(f) and _is_token(l):
+        return _strict_perms(f, l, fi, li, at_domain)
     variants = []
     if f and l:
         variants.extend([
-            f"{f}.{l}",
-            f"{fi}{l}",
-            f"{f}{li}",
-            f"{f}{l}",
+            f + "." + l,
+            fi + l,
+            f + li,
+            f + l,
         ])
     elif f:
         variants.append(f)
+    candidates: List[str] = []
     for local_part in variants:
-        lp = re.sub(r"[^a-z0-9\._-]", "", local_part)
-        lp = re.sub(r"[\._-]+", lambda m: m.group(0)[0], lp).strip("._-")
+        lp = collapse_separators(local_part.translate(_LOCAL_CHARS)).strip("._-")
         if lp:
-            candidates.add(f"{lp}@{domain}")
-    return candidates
+            candidates.append(lp + at_domain)
+    return tuple(candidates)
 
 
 def read_rows(input_csv: str) -> Iterable[Tuple[str, str]]:
-    with open(input_csv, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        full_name_key = None
-        username_key = None
-        first_key = None
-        last_key = None
-        header = reader.fieldnames or []
-        for k in header:
-            lk = k.lower()
-            if lk in ("fullname", "full_name", "name"):
-                full_name_key = k
-            if lk in ("username", "user_name", "handle"):
-                username_key = k
-            if lk in ("first_name", "firstname", "first"):
-                first_key = k
-            if lk in ("last_name", "lastname", "last"):
-                last_key = k
-        if full_name_key is None and first_key and last_key:
+    with open(input_csv, newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        columns = resolve_columns(header, COLUMN_ROLES)
+        full_name_idx = columns.get("full")
+        username_idx = columns.get("user")
+        first_idx = columns.get("first")
+        last_idx = columns.get("last")
+        # Short rows are padded so a missing or absent column reads as the empty cell at index `width`
+        width = len(header)
+        if full_name_idx is None and first_idx is not None and last_idx is not None:
             for row in reader:
-                first = (row.get(first_key, "") or "").strip()
-                last = (row.get(last_key, "") or "").strip()
+                if not row:
+                    continue
+                if len(row) <= width:
+                    row += [""] * (width + 1 - len(row))
+                first = row[first_idx].strip()
+                last = row[last_idx].strip()
                 if not first or not last:
                     yield "", ""
                     continue
                 yield f"{first} {last}", ""
             return
-        if full_name_key is None and "fullName" in (reader.fieldnames or []):
-            full_name_key = "fullName"
-        if username_key is None:
-            username_key = "username" if "username" in (reader.fieldnames or []) else None
-        if full_name_key is None and (first_key is None or last_key is None):
+
+        if full_name_idx is None:
             raise ValueError("CSV must include either (full name + username) or (first_name & last_name)")
+        if username_idx is None:
+            username_idx = width
+
         for row in reader:
-            yield (row.get(full_name_key, "") or "").strip(), (row.get(username_key, "") or "").strip()
+            if not row:
+                continue
+            if len(row) <= width:
+                row += [""] * (width + 1 - len(row))
+            yield row[full_name_idx].strip(), row[username_idx].strip()
+
+
+def process_row(row: Tuple[str, str], domain: str) -> Tuple[str, str, Tuple[str, ...]]:
+    full_name, username = row
+    if not full_name and not username:
+        return full_name, username, ()
+    first, last = split_name(full_name)
+    if not first and not last:
+        return full_name, username, ()
+    return full_name, username, generate_permutations(first, last, domain=domain)
 
 
 def main():
@@ -99,38 +170,49 @@ def main():
     parser.add_argument("input_csv", help="Input CSV with full_name or first/last columns")
     parser.add_argument("--output", "-o", default="permuted_emails_generic.csv", help="Output CSV path")
     parser.add_argument("--domain", required=True, help="Email domain, e.g., colgate.edu")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes generating permutations (1 = in-process)")
     parser.add_argument("--limit", type=int, default=0, help="Process only first N people (0 = all)")
     args = parser.parse_args()
 
     unique_emails: Set[str] = set()
-    output_rows: List[Tuple[str, str, str]] = []
-
-    processed_people = 0
-    for full_name, username in read_rows(args.input_csv):
-        if args.limit and processed_people >= args.limit:
-            break
-        if not full_name and not username:
-            continue
-        first, last = split_name(full_name)
-        if not first and not last:
-            continue
-        emails = generate_permutations(first, last, domain=args.domain)
-        person_had_any = False
-        for email in emails:
-            if email in unique_emails:
-                continue
-            unique_emails.add(email)
-            output_rows.append((full_name, username, email))
-            person_had_any = True
-        if person_had_any:
-            processed_people += 1
-
-    with open(args.output, "w", newline="", encoding="utf-8") as f:
+    # Rows go straight to the writer; only the dedup set of address strings stays resident
+    with open(args.output, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
         writer = csv.writer(f)
-        writer.writerow(["full_name", "username", "email"]) 
-        writer.writerows(output_rows)
-
-    print(f"Wrote {len(output_rows)} permuted emails to {args.output} (people={processed_people}, domain={args.domain})")
+        writer.writerow(["full_name", "username", "email"])
+
+        processed_people = 0
+        total_emitted = 0
+        # Rows are handed to writerows in chunks to spread the per-call overhead
+        buf: List[Tuple[str, str, str]] = []
+        process = partial(process_row, domain=args.domain)
+        rows = read_rows(args.input_csv)
+        with ExitStack() as stack:
+            if args.workers > 1:
+                # Per-row work is microseconds and usually outweighed by pickling, so a pool is opt-in.
+                # Ordered imap keeps the output and first-owner dedup identical to a serial run.
+                pool = stack.enter_context(Pool(args.workers))
+                results = pool.imap(process, rows, chunksize=1024)
+            else:
+                results = map(process, rows)
+            for full_name, username, emails in results:
+                if args.limit and processed_people >= args.limit:
+                    break
+                person_had_any = False
+                for email in emails:
+                    if email in unique_emails:
+                        continue
+                    unique_emails.add(email)
+                    buf.append((full_name, username, email))
+                    total_emitted += 1
+                    if len(buf) >= WRITE_CHUNK:
+                        writer.writerows(buf)
+                        buf.clear()
+                    person_had_any = True
+                if person_had_any:
+                    processed_people += 1
+        writer.writerows(buf)
+
+    print(f"Wrote {total_emitted} permuted emails to {args.output} (people={processed_people}, domain={args.domain})")
 
 
 if __name__ == "__main__":
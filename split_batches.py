@@ -1,22 +1,48 @@
 #!/usr/bin/env python3
 import csv
+from contextlib import ExitStack
 from pathlib import Path
 
+CSV_BUFFER = 1 << 20
+FIELDNAMES = ['full_name', 'username', 'email']
+N_BATCHES = 11
+WRITE_CHUNK = 4096
+
 in_path = Path('colgate/permuted_colgate_all.csv')
-rows = list(csv.DictReader(in_path.open()))
-people = {}
-for r in rows:
-    people.setdefault(r['full_name'], []).append(r)
-full_names = list(people.keys())
+out_paths = [Path(f'colgate/colgate_batch_{i:02d}.csv') for i in range(N_BATCHES)]
+
+# Single streaming pass: each distinct full_name is assigned the next batch round-robin on first
+# sight, and every row goes straight to its batch's writer
+with ExitStack() as stack:
+    f = stack.enter_context(in_path.open(newline='', encoding='utf-8', buffering=CSV_BUFFER))
+    writers = []
+    for out in out_paths:
+        w = csv.writer(stack.enter_context(out.open('w', newline='', encoding='utf-8', buffering=CSV_BUFFER)))
+        w.writerow(FIELDNAMES)
+        writers.append(w)
+    counts = [0] * N_BATCHES
+    bufs = [[] for _ in range(N_BATCHES)]
 
-batches = [[] for _ in range(11)]
-for idx, name in enumerate(full_names):
-    batches[idx % 11].extend(people[name])
+    reader = csv.reader(f)
+    header = next(reader, None) or []
+    width = len(header)
+    cols = [header.index(k) if k in header else width for k in FIELDNAMES]
+    name_to_batch = {}
+    for r in reader:
+        if not r:
+            continue
+        if len(r) <= width:
+            r += [''] * (width + 1 - len(r))
+        out_row = [r[i] for i in cols]
+        batch = name_to_batch.setdefault(out_row[0], len(name_to_batch) % N_BATCHES)
+        buf = bufs[batch]
+        buf.append(out_row)
+        counts[batch] += 1
+        if len(buf) >= WRITE_CHUNK:
+            writers[batch].writerows(buf)
+            buf.clear()
+    for w, buf in zip(writers, bufs):
+        w.writerows(buf)
 
-for i, batch in enumerate(batches):
-    out = Path(f'colgate/colgate_batch_{i:02d}.csv')
-    with out.open('w', newline='', encoding='utf-8') as f:
-        w = csv.DictWriter(f, fieldnames=['full_name','username','email'])
-        w.writeheader()
-        w.writerows(batch)
-    print(out, len(batch))
+for out, n in zip(out_paths, counts):
+    print(out, n)